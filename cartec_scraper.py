@@ -1,11 +1,15 @@
 import os
+import time
 import json
 import logging
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import pandas as pd
 from playwright.sync_api import Playwright, sync_playwright
 from parsel import Selector
+from crawl_pipeline import CrawlPipeline, clean_text
+from crawl_scheduler import CrawlScheduler
+from crawl_store import CrawlStore
+from excel_export import export_workbook
 
 class CartecScraperApp:
     def __init__(self, master):
@@ -38,6 +42,11 @@ class CartecScraperApp:
         tk.Entry(output_frame, textvariable=self.output_path, width=50).pack(side=tk.LEFT, expand=True, fill=tk.X, padx=(0,10))
         tk.Button(output_frame, text="Browse", command=self.choose_output_file).pack(side=tk.RIGHT)
 
+        # Time Budget
+        tk.Label(self.master, text="Time Budget (minutes, empty for no limit):").pack(pady=(10,0))
+        self.time_budget = tk.StringVar(value=self.state.get('time_budget', ''))
+        tk.Entry(self.master, textvariable=self.time_budget, width=10).pack()
+
         # Progress Tracking
         tk.Label(self.master, text="Scraping Progress:").pack(pady=(10,0))
         self.progress_var = tk.StringVar(value="Not Started")
@@ -113,6 +122,22 @@ class CartecScraperApp:
         except Exception as e:
             self.log_message(f"Error saving state: {e}")
 
+    def get_time_budget(self):
+        """
+        Read the time budget field.
+
+        Returns:
+            float or None: Budget in seconds, None when empty or invalid
+        """
+        value = self.time_budget.get().strip()
+        if not value:
+            return None
+        try:
+            return float(value) * 60
+        except ValueError:
+            self.log_message(f"Invalid time budget '{value}', running without a limit")
+            return None
+
     def reset_progress(self):
         """Reset scraping progress."""
         if messagebox.askyesno("Reset Progress", "Are you sure you want to reset all progress?"):
@@ -148,68 +173,53 @@ class CartecScraperApp:
             # Re-enable start button
             self.start_button.config(state=tk.NORMAL)
 
-    def remove_duplicate_rows(self, file_path):
+    def export_excel(self, store_path, file_path):
         """
-        Remove duplicate rows from the Excel file.
+        Export the crawl store to the Excel file, one sheet per marque plus a summary.
         
         Args:
-            file_path (str): Path to the Excel file to process
+            store_path (str): Path to the crawl store database
+            file_path (str): Path to the Excel file to write
         
         Returns:
-            int: Number of duplicate rows removed
+            int: Number of rows exported
         """
+        store = CrawlStore(store_path)
         try:
-            # Read the Excel file
-            df = pd.read_excel(file_path)
-            
-            # Get the initial number of rows
-            initial_rows = len(df)
-            
-            # Remove duplicate rows, keeping the first occurrence
-            df_unique = df.drop_duplicates(subset=['MARQUE', 'MODELE', 'MOTORISATION'], keep='first')
-            
-            # Calculate number of duplicates removed
-            duplicates_removed = initial_rows - len(df_unique)
-            
-            # Save the unique rows back to the Excel file
-            df_unique.to_excel(file_path, index=False)
-            
-            # Log the duplicate removal
-            if duplicates_removed > 0:
-                self.log_message(f"Removed {duplicates_removed} duplicate rows from {file_path}")
-            
-            return duplicates_removed
-        
-        except Exception as e:
-            self.log_message(f"Error removing duplicates: {e}")
-            return 0
+            exported = export_workbook(store, file_path)
+        finally:
+            store.close()
+        self.log_message(f"Exported {exported} rows to {file_path}")
+        return exported
 
     def run_scraper(self, playwright: Playwright) -> None:
         """Main scraping logic with state management."""
         # Prepare output file
         output_path = self.output_path.get()
         
-        # Load existing data if file exists
-        if os.path.exists(output_path):
-            existing_df = pd.read_excel(output_path)
-            self.log_message(f"Loaded existing data: {len(existing_df)} rows")
-        else:
-            existing_df = pd.DataFrame(columns=['MARQUE', 'MODELE', 'MOTORISATION'])
-
-        # Initialize lists to collect data
-        total_marques_names = existing_df['MARQUE'].tolist()
-        total_modeles_names = existing_df['MODELE'].tolist()
-        motorisation_true_names = existing_df['MOTORISATION'].tolist()
-        
-        # Track processed combinations to avoid duplicates
-        processed_combinations = set(zip(total_marques_names, total_modeles_names, motorisation_true_names))
+        # Scraped rows are kept in a store next to the output file and exported at the end
+        store_path = os.path.splitext(output_path)[0] + '.sqlite'
+        store = CrawlStore(store_path)
+        try:
+            if store.count() == 0 and os.path.exists(output_path):
+                store.import_excel(output_path)
+            self.log_message(f"Loaded existing data: {store.count()} rows")
+            rows_before = {marque: row_count for marque, _, row_count in store.summary()}
+        finally:
+            store.close()
 
-        # Determine the starting point
-        last_marque = existing_df['MARQUE'].iloc[-1] if len(existing_df) > 0 else None
+        # Crawl order comes from per-manufacturer history kept in the state file
+        scheduler = CrawlScheduler(self.state.get('manufacturers', {}))
+        time_budget = self.get_time_budget()
+        crawled_marques = []
         
         # Browser and context setup
         browser = playwright.chromium.launch(headless=False)
         context = browser.new_context()
+
+        # Parsing, dedupe and storage run on worker threads so the browser never waits on disk
+        pipeline = CrawlPipeline(store_path).start()
+        error = None
         
         try:
             page = context.new_page()
@@ -224,25 +234,25 @@ class CartecScraperApp:
             marques_names = selector.css("#manufacturer-select > option ::text").getall()
             
             # Clean marque names
-            marques_true_names = []
-            for marque in marques_names[1:]:
-                marques_true_names.append(
-                    str(marque).replace("\n","").replace("            ","").replace("    ","")
-                )
-
-            # Find starting index
-            start_index = 1  # Default to start from the beginning
-            if last_marque:
-                try:
-                    start_index = marques_true_names.index(last_marque) + 1
-                    self.log_message(f"Resuming from last marque: {last_marque}")
-                except ValueError:
-                    self.log_message(f"Last marque {last_marque} not found. Starting from the beginning.")
-                    start_index = 1
+            marques_true_names = [clean_text(marque) for marque in marques_names[1:]]
+
+            marque_values = dict(zip(marques_true_names, marques[1:]))
+
+            # Stalest, most changing and largest manufacturers first, within the time budget
+            schedule = scheduler.order(marques_true_names, time_budget)
+            self.log_message(f"Scheduled {len(schedule)} of {len(marques_true_names)} marques")
+            for name, estimate in scheduler.oversized(marques_true_names, time_budget):
+                self.log_message(f"Marque {name} needs about {estimate / 60:.0f} min, more than the time budget")
+            deadline = time.monotonic() + time_budget if time_budget is not None else None
 
             # Iterate through marques
-            for marque_index, marque in enumerate(marques[start_index:], start_index):
-                self.log_message(f"Processing Marque: {marques_true_names[marque_index-1]}")
+            for marque_index, current_marque in enumerate(schedule, 1):
+                if deadline is not None and time.monotonic() >= deadline:
+                    self.log_message(f"Time budget reached, stopping before {current_marque}")
+                    break
+                marque = marque_values[current_marque]
+                marque_started = time.monotonic()
+                self.log_message(f"Processing Marque: {current_marque}")
                 page.locator("#manufacturer-select").select_option(str(marque))
                 page.wait_for_timeout(200)
                 
@@ -254,86 +264,104 @@ class CartecScraperApp:
                 modeles_names = selector.css("#model-select > option ::text").getall()[1:]
                 
                 # Iterate through models
+                budget_reached = False
                 for modele_index, modele in enumerate(modeles[1:], 1):
+                    if deadline is not None and time.monotonic() >= deadline:
+                        budget_reached = True
+                        break
                     try:
-                        modele_name = str(modeles_names[modele_index-1]).replace("\n","").replace("            ","").replace("    ","")
+                        modele_name = clean_text(modeles_names[modele_index-1])
                         
                         page.locator("#model-select").select_option(str(modele))
                         page.wait_for_timeout(200)
                         
-                        page_source = page.locator("html").inner_html()
-                        selector = Selector(page_source)
-                        
-                        # Get motorisations
-                        motorisation_names = selector.css("#vehicle-select  option ::text").getall()[1:]
-                        
-                        # Track motorisation additions for this model
-                        model_additions = 0
-                        
-                        # Collect data for this model's motorisations
-                        for motorisation_index, motorisation in enumerate(motorisation_names[1:], 1):
-                            current_marque = marques_true_names[marque_index-1]
-                            clean_motorisation = str(motorisation).replace("\n","").replace("            ","").replace("    ","")
-                            
-                            # Check if this combination already exists
-                            if (current_marque, modele_name, clean_motorisation) not in processed_combinations:
-                                total_marques_names.append(current_marque)
-                                total_modeles_names.append(modele_name)
-                                motorisation_true_names.append(clean_motorisation)
-                                
-                                # Add to processed combinations
-                                processed_combinations.add((current_marque, modele_name, clean_motorisation))
-                                model_additions += 1
-                        
-                        # Log model-specific information
-                        self.log_message(f"Model {modele_name}: Added {model_additions} new entries")
-                        
-                        # Create temporary DataFrame to save progress incrementally
-                        temp_df = pd.DataFrame({
-                            'MARQUE': total_marques_names,
-                            'MODELE': total_modeles_names,
-                            'MOTORISATION': motorisation_true_names
-                        })
-                        temp_df.to_excel(output_path, index=False)
+                        # Hand the page off to the parse worker and move on to the next model
+                        pipeline.submit(current_marque, modele_name, page.locator("html").inner_html())
                         
                         # Update progress
-                        progress_percentage = (marque_index / len(marques[1:])) * 100
-                        self.progress_bar['value'] = progress_percentage
-                        self.progress_var.set(
-                            f"Processing {marques_true_names[marque_index-1]} - {modele_name}"
+                        self.update_pipeline_progress(
+                            pipeline,
+                            (marque_index / len(schedule)) * 100,
+                            f"Processing {current_marque} - {modele_name}"
                         )
-                        self.master.update_idletasks()
 
                     except Exception as model_error:
+                        if pipeline.error is not None:
+                            raise
                         self.log_message(f"Error processing model {modele_name}: {model_error}")
                         continue
 
-                # Log column lengths
-                self.log_message(f"Current data lengths - Marques: {len(total_marques_names)}, Modeles: {len(total_modeles_names)}, Motorisations: {len(motorisation_true_names)}")
+                # Log queue depths
+                depths = pipeline.queue_depths()
+                self.log_message(f"Pipeline queue depths - Parse: {depths['parse']}, Write: {depths['write']}")
 
-            # Final DataFrame and save
-            df = pd.DataFrame({
-                'MARQUE': total_marques_names,
-                'MODELE': total_modeles_names,
-                'MOTORISATION': motorisation_true_names
-            })
-            
-            df.to_excel(output_path, index=False)
-            
-            # Remove duplicate rows after scraping
-            duplicates_removed = self.remove_duplicate_rows(output_path)
-            
-            messagebox.showinfo("Scraping Complete", f"Data saved to {output_path}\n{duplicates_removed} duplicate rows removed.")
-            self.progress_var.set("Scraping Complete")
-            self.progress_bar['value'] = 100
+                # A partial crawl must not update the marque's size, duration or change rate
+                if budget_reached:
+                    self.log_message(f"Time budget reached, stopping during {current_marque}")
+                    scheduler.record_partial(current_marque)
+                    self.state['manufacturers'] = scheduler.history
+                    self.save_state(self.state)
+                    break
+
+                # Remember when and how long this marque was crawled for the next schedule
+                scheduler.record_crawl(current_marque, len(modeles[1:]), time.monotonic() - marque_started)
+                crawled_marques.append(current_marque)
+                self.state['manufacturers'] = scheduler.history
+                self.save_state(self.state)
 
         except Exception as e:
-            self.log_message(f"Scraping Error: {e}")
-            messagebox.showerror("Scraping Error", str(e))
+            # A failed worker stage stops submit() with a wrapper; report the worker's own error
+            error = pipeline.error or e
+            self.log_message(f"Scraping Error: {error}")
         finally:
             context.close()
             browser.close()
 
+            # Wait for the workers to store everything still queued, also after an error,
+            # so the next run can resume from it
+            self.progress_var.set("Saving remaining data...")
+            self.master.update_idletasks()
+            try:
+                total_rows = pipeline.close()
+                self.log_message(f"Stored {total_rows} unique rows in {store_path}")
+            except Exception as e:
+                if e is not error:
+                    self.log_message(f"Error saving data: {e}")
+                error = error or e
+            pipeline.drain_events(self.log_message)
+
+            # Change rates need the writer's counts, so they are recorded once it has drained
+            for name in crawled_marques:
+                scheduler.record_changes(name, pipeline.new_rows_by_marque.get(name, 0), rows_before.get(name, 0))
+            self.state['manufacturers'] = scheduler.history
+            self.state['time_budget'] = self.time_budget.get()
+            self.save_state(self.state)
+
+        # Write the Excel file from the deduplicated store, partial crawls included
+        self.progress_var.set("Exporting Excel file...")
+        self.master.update_idletasks()
+        try:
+            exported_rows = self.export_excel(store_path, output_path)
+        except Exception as e:
+            self.log_message(f"Error exporting data: {e}")
+            error = error or e
+
+        if error is not None:
+            messagebox.showerror("Scraping Error", str(error))
+            return
+
+        messagebox.showinfo("Scraping Complete", f"Data saved to {output_path}\n{exported_rows} unique rows exported.")
+        self.progress_var.set("Scraping Complete")
+        self.progress_bar['value'] = 100
+
+    def update_pipeline_progress(self, pipeline, percentage, message):
+        """Show worker messages, progress and pipeline queue depths in the UI."""
+        pipeline.drain_events(self.log_message)
+        depths = pipeline.queue_depths()
+        self.progress_bar['value'] = percentage
+        self.progress_var.set(f"{message} (queued: parse {depths['parse']}, write {depths['write']})")
+        self.master.update_idletasks()
+
 def main():
     root = tk.Tk()
     app = CartecScraperApp(root)
@@ -0,0 +1,154 @@
+import queue
+import threading
+from parsel import Selector
+from crawl_store import CrawlStore
+
+# Marks the end of a stage's input; forwarded downstream so every stage drains in order
+_SENTINEL = object()
+
+
+def clean_text(value):
+    """Strip the newlines and indentation cartec.ma puts around option labels."""
+    return str(value).replace("\n","").replace("            ","").replace("    ","")
+
+
+class CrawlPipeline:
+    """
+    Producer/consumer pipeline between the browser and the output file.
+
+    The browser-driving code (producer) only grabs page sources and calls
+    `submit`. A parse worker turns them into (MARQUE, MODELE, MOTORISATION)
+    rows, and a persistence writer inserts them into the CrawlStore, which
+    drops the ones already scraped. Stages are connected by bounded queues, so a slow
+    downstream stage applies backpressure instead of growing memory, and
+    `close` drains every queue before returning.
+
+    Worker threads never touch the GUI: their messages are put on `events`
+    and must be drained by the caller's thread (see `drain_events`).
+    """
+
+    def __init__(self, store_path, parse_queue_size=32, write_queue_size=64):
+        """
+        Args:
+            store_path (str): CrawlStore database the writer inserts into
+            parse_queue_size (int): Max page sources waiting to be parsed
+            write_queue_size (int): Max parsed batches waiting to be written
+        """
+        self.store_path = store_path
+
+        self.parse_queue = queue.Queue(maxsize=parse_queue_size)
+        self.write_queue = queue.Queue(maxsize=write_queue_size)
+        self.events = queue.SimpleQueue()
+
+        self.error = None
+        # New rows found per manufacturer, updated by the writer
+        self.new_rows_by_marque = {}
+        self.rows_written = 0
+
+        self._parser = threading.Thread(target=self._parse_loop, name="cartec-parser", daemon=True)
+        self._writer = threading.Thread(target=self._write_loop, name="cartec-writer", daemon=True)
+
+    def start(self):
+        self._parser.start()
+        self._writer.start()
+        return self
+
+    def submit(self, marque_name, modele_name, page_source):
+        """
+        Hand a model page source to the parse worker. Blocks while the parse
+        queue is full, and raises if a worker stage has failed.
+        """
+        self._put(self.parse_queue, (marque_name, modele_name, page_source))
+
+    def queue_depths(self):
+        """
+        Returns:
+            dict: Current number of items waiting in each stage's queue
+        """
+        return {
+            'parse': self.parse_queue.qsize(),
+            'write': self.write_queue.qsize(),
+        }
+
+    def drain_events(self, callback):
+        """Pass every pending worker message to `callback` in the caller's thread."""
+        while True:
+            try:
+                message = self.events.get_nowait()
+            except queue.Empty:
+                return
+            callback(message)
+
+    def close(self):
+        """
+        Stop accepting work, let both stages drain their queues and wait for
+        the last insert. Safe to call after a worker failure.
+
+        Returns:
+            int: Number of rows in the store
+        """
+        if self._parser.is_alive():
+            self._put(self.parse_queue, _SENTINEL, check_error=False)
+        self._parser.join()
+        self._writer.join()
+        if self.error is not None:
+            raise self.error
+        return self.rows_written
+
+    def _put(self, target, item, check_error=True):
+        # Poll so a dead consumer surfaces as an error instead of a deadlock
+        while True:
+            if check_error and self.error is not None:
+                raise RuntimeError(f"Crawl pipeline stopped: {self.error}")
+            try:
+                target.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                if target is self.parse_queue and not self._parser.is_alive():
+                    return
+                if target is self.write_queue and not self._writer.is_alive():
+                    return
+
+    def _parse_loop(self):
+        try:
+            while True:
+                item = self.parse_queue.get()
+                if item is _SENTINEL:
+                    break
+                marque_name, modele_name, page_source = item
+                try:
+                    batch = self._parse(marque_name, modele_name, page_source)
+                except Exception as parse_error:
+                    self.events.put(f"Error parsing model {modele_name}: {parse_error}")
+                    continue
+                self._put(self.write_queue, (marque_name, modele_name, batch), check_error=False)
+        except Exception as e:
+            self.error = e
+        finally:
+            self._put(self.write_queue, _SENTINEL, check_error=False)
+
+    def _parse(self, marque_name, modele_name, page_source):
+        """Extract the motorisation rows of one model page."""
+        selector = Selector(page_source)
+        motorisation_names = selector.css("#vehicle-select  option ::text").getall()[1:]
+        return [(marque_name, modele_name, clean_text(motorisation)) for motorisation in motorisation_names[1:]]
+
+    def _write_loop(self):
+        store = None
+        try:
+            # SQLite connections are bound to the thread that opens them
+            store = CrawlStore(self.store_path)
+            while True:
+                item = self.write_queue.get()
+                if item is _SENTINEL:
+                    break
+                marque_name, modele_name, batch = item
+                added = store.add_rows(batch) if batch else 0
+                self.new_rows_by_marque[marque_name] = self.new_rows_by_marque.get(marque_name, 0) + added
+                self.events.put(f"Model {modele_name}: Added {added} new entries")
+            self.rows_written = store.count()
+        except Exception as e:
+            self.error = e
+        finally:
+            if store is not None:
+                store.close()
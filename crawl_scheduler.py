@@ -0,0 +1,190 @@
+import math
+import time
+import heapq
+
+# Seconds assumed per model when a manufacturer has no recorded crawl duration
+DEFAULT_SECONDS_PER_MODEL = 1.5
+# Models assumed for a manufacturer that has never been crawled
+DEFAULT_MODEL_COUNT = 20
+# Weight of the latest crawl in the change-rate moving average
+CHANGE_RATE_ALPHA = 0.5
+# Floor on the change rate so stable manufacturers still age into the schedule
+MIN_CHANGE_RATE = 0.05
+
+
+class CrawlScheduler:
+    """
+    Decide which manufacturers to crawl first.
+
+    Each manufacturer is scored by how stale its data is, how often it
+    changed in past crawls and how many models it has, so that within a
+    limited time window the most valuable data is refreshed first instead
+    of always following the `#manufacturer-select` order. Manufacturers
+    never crawled before come first, in the order they are given (their
+    size is only known once they have been crawled).
+
+    History is a plain dict so it can be stored in the scraper state file:
+        {name: {'last_crawled': ts, 'model_count': n, 'duration': s, 'change_rate': r,
+                'last_partial': ts}}
+    """
+
+    def __init__(self, history=None, now=None):
+        """
+        Args:
+            history (dict, optional): Per-manufacturer stats from previous runs
+            now (float, optional): Reference timestamp, defaults to time.time()
+        """
+        self.history = history if history is not None else {}
+        self.now = now if now is not None else time.time()
+        # record_crawl overwrites last_crawled, so remember which ones had a baseline
+        self.crawled_before = {
+            name for name, stats in self.history.items() if stats.get('last_crawled') is not None
+        }
+
+    def estimated_duration(self, name):
+        """
+        Returns:
+            float: Expected crawl time of a manufacturer in seconds
+        """
+        stats = self.history.get(name, {})
+        if stats.get('duration'):
+            return stats['duration']
+        return stats.get('model_count', DEFAULT_MODEL_COUNT) * DEFAULT_SECONDS_PER_MODEL
+
+    def priority(self, name):
+        """
+        Value of refreshing a manufacturer now: staleness in hours, weighted
+        by its observed change rate and (logarithmically) its model count.
+        A partial crawl cut off by the time budget also resets staleness, so
+        an oversized manufacturer does not take every run.
+
+        Returns:
+            float: Higher is crawled first, `inf` for never-crawled manufacturers
+        """
+        stats = self.history.get(name)
+        if not stats or stats.get('last_crawled') is None:
+            return math.inf
+        refreshed = max(stats['last_crawled'], stats.get('last_partial') or 0)
+        staleness = max(self.now - refreshed, 0) / 3600
+        change_rate = max(stats.get('change_rate', 1.0), MIN_CHANGE_RATE)
+        size = math.log1p(stats.get('model_count', DEFAULT_MODEL_COUNT))
+        return staleness * change_rate * size
+
+    def order(self, names, time_budget=None):
+        """
+        Order manufacturers by priority, keeping only those that fit in the
+        time budget when one is given. The top-priority manufacturer is kept
+        even when it alone exceeds the budget, so that it still gets a
+        partial refresh instead of never being scheduled.
+
+        Args:
+            names (list): Manufacturer names to schedule
+            time_budget (float, optional): Seconds available for this run
+
+        Returns:
+            list: Manufacturer names in crawl order
+        """
+        # Ties go to the longest recorded job first; the sort is stable, so
+        # never-crawled manufacturers keep the order they were given in
+        ranked = sorted(
+            names,
+            key=lambda name: (self.priority(name), self.estimated_duration(name)),
+            reverse=True
+        )
+        if time_budget is None:
+            return ranked
+
+        selected = []
+        remaining = time_budget
+        for name in ranked:
+            duration = self.estimated_duration(name)
+            if duration <= remaining or not selected:
+                selected.append(name)
+                remaining = max(remaining - duration, 0)
+        return selected
+
+    def oversized(self, names, time_budget):
+        """
+        Returns:
+            list: (name, estimated duration) of manufacturers longer than the budget
+        """
+        if time_budget is None:
+            return []
+        return [
+            (name, self.estimated_duration(name)) for name in names
+            if self.estimated_duration(name) > time_budget
+        ]
+
+    def plan(self, names, workers, time_budget=None):
+        """
+        Split the schedule across parallel workers: pick manufacturers by
+        priority within the combined budget, then assign them longest job
+        first to the least loaded worker. Manufacturers longer than the
+        per-worker budget are never scheduled.
+
+        Args:
+            names (list): Manufacturer names to schedule
+            workers (int): Number of parallel browser workers
+            time_budget (float, optional): Seconds available per worker
+
+        Returns:
+            list: One list of manufacturer names per worker, each in crawl order
+        """
+        total_budget = None
+        if time_budget is not None:
+            names = [name for name in names if self.estimated_duration(name) <= time_budget]
+            total_budget = time_budget * workers
+        selected = self.order(names, total_budget)
+
+        queues = [[] for _ in range(workers)]
+        loads = [(0.0, index) for index in range(workers)]
+        for name in sorted(selected, key=self.estimated_duration, reverse=True):
+            load, index = heapq.heappop(loads)
+            duration = self.estimated_duration(name)
+            if time_budget is not None and load + duration > time_budget:
+                # The least loaded worker has no room, so no worker has
+                heapq.heappush(loads, (load, index))
+                continue
+            queues[index].append(name)
+            heapq.heappush(loads, (load + duration, index))
+
+        # Within each worker the most valuable data is still refreshed first
+        rank = {name: position for position, name in enumerate(selected)}
+        return [sorted(queue, key=rank.get) for queue in queues]
+
+    def record_crawl(self, name, model_count, duration, crawled_at=None):
+        """Store the size and duration of a finished manufacturer crawl."""
+        stats = self.history.setdefault(name, {})
+        stats['last_crawled'] = crawled_at if crawled_at is not None else time.time()
+        stats['model_count'] = model_count
+        stats['duration'] = duration
+
+    def record_partial(self, name, crawled_at=None):
+        """
+        Note a crawl cut off by the time budget. Size, duration and change
+        rate are left alone since they would describe an incomplete crawl.
+        """
+        stats = self.history.setdefault(name, {})
+        stats['last_partial'] = crawled_at if crawled_at is not None else time.time()
+
+    def record_changes(self, name, new_rows, rows_before):
+        """
+        Update the change rate of a manufacturer with the number of new rows
+        its latest crawl found, as new rows per model.
+
+        A first crawl, or one of a manufacturer with no stored rows yet, only
+        sets the baseline: everything it finds is new, which says nothing
+        about how often the manufacturer changes.
+
+        Args:
+            name (str): Manufacturer name
+            new_rows (int): Rows added to the store by the latest crawl
+            rows_before (int): Rows stored for the manufacturer before it
+        """
+        if rows_before == 0 or name not in self.crawled_before:
+            return
+        stats = self.history.setdefault(name, {})
+        rate = new_rows / max(stats.get('model_count', DEFAULT_MODEL_COUNT), 1)
+        if 'change_rate' in stats:
+            rate = CHANGE_RATE_ALPHA * rate + (1 - CHANGE_RATE_ALPHA) * stats['change_rate']
+        stats['change_rate'] = rate
@@ -0,0 +1,100 @@
+import sqlite3
+from openpyxl import load_workbook
+
+COLUMNS = ['MARQUE', 'MODELE', 'MOTORISATION']
+
+# Rows read from a legacy Excel file per insert
+IMPORT_BATCH_SIZE = 1000
+
+
+class CrawlStore:
+    """
+    Intermediate store of scraped rows, backed by SQLite.
+
+    Rows are deduplicated on insert by a unique (MARQUE, MODELE, MOTORISATION)
+    constraint, so nothing downstream has to hold the catalogue in memory to
+    dedupe it. A connection may only be used from the thread that opened it.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): SQLite database file, created if missing
+        """
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS vehicles ("
+            "marque TEXT NOT NULL, modele TEXT NOT NULL, motorisation TEXT NOT NULL, "
+            "UNIQUE (marque, modele, motorisation))"
+        )
+        self.connection.commit()
+
+    def add_rows(self, rows):
+        """
+        Insert rows, skipping those already stored.
+
+        Args:
+            rows (list): (MARQUE, MODELE, MOTORISATION) tuples
+
+        Returns:
+            int: Number of rows actually added
+        """
+        before = self.connection.total_changes
+        self.connection.executemany(
+            "INSERT OR IGNORE INTO vehicles (marque, modele, motorisation) VALUES (?, ?, ?)",
+            rows
+        )
+        self.connection.commit()
+        return self.connection.total_changes - before
+
+    def count(self):
+        return self.connection.execute("SELECT COUNT(*) FROM vehicles").fetchone()[0]
+
+    def summary(self):
+        """
+        Returns:
+            list: (MARQUE, model count, row count) tuples ordered by MARQUE
+        """
+        return self.connection.execute(
+            "SELECT marque, COUNT(DISTINCT modele), COUNT(*) FROM vehicles "
+            "GROUP BY marque ORDER BY marque"
+        ).fetchall()
+
+    def iter_rows(self):
+        """Stream all rows grouped by MARQUE, in insertion order within a marque."""
+        return self.connection.execute(
+            "SELECT marque, modele, motorisation FROM vehicles ORDER BY marque, rowid"
+        )
+
+    def import_excel(self, file_path):
+        """
+        Load rows from an Excel file written by an earlier version of the
+        scraper. Every sheet whose header is MARQUE, MODELE, MOTORISATION is read.
+
+        Returns:
+            int: Number of rows added
+        """
+        workbook = load_workbook(file_path, read_only=True)
+        added = 0
+        try:
+            for sheet in workbook.worksheets:
+                rows = sheet.iter_rows(values_only=True)
+                header = next(rows, None)
+                if header is None or list(header[:3]) != COLUMNS:
+                    continue
+                batch = []
+                for row in rows:
+                    if row[0] is None:
+                        continue
+                    batch.append(tuple(str(value) for value in row[:3]))
+                    if len(batch) >= IMPORT_BATCH_SIZE:
+                        added += self.add_rows(batch)
+                        batch = []
+                added += self.add_rows(batch)
+        finally:
+            workbook.close()
+        return added
+
+    def close(self):
+        self.connection.close()
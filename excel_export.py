@@ -0,0 +1,71 @@
+import re
+from openpyxl import Workbook
+from crawl_store import COLUMNS
+
+SUMMARY_SHEET = 'Summary'
+# Excel limits sheet names to 31 characters and forbids these characters
+MAX_SHEET_NAME = 31
+INVALID_SHEET_CHARS = re.compile(r'[\[\]:*?/\\]')
+
+
+def sheet_name(marque, used_names):
+    """
+    Build a valid, unique (case-insensitive) sheet name for a manufacturer.
+
+    Args:
+        marque (str): Manufacturer name
+        used_names (set): Lower-cased names already taken, updated in place
+
+    Returns:
+        str: Sheet name
+    """
+    base = INVALID_SHEET_CHARS.sub('_', str(marque))
+    # Excel rejects names starting or ending with an apostrophe, so strip after cutting
+    name = base[:MAX_SHEET_NAME].strip("' ") or 'Sheet'
+    suffix = 2
+    while name.lower() in used_names:
+        tail = f" ({suffix})"
+        name = (base[:MAX_SHEET_NAME - len(tail)].strip("' ") or 'Sheet') + tail
+        suffix += 1
+    used_names.add(name.lower())
+    return name
+
+
+def export_workbook(store, output_path):
+    """
+    Stream the store into a write-only workbook: a summary sheet followed by
+    one sheet per manufacturer. Rows are written as they are read, so memory
+    stays constant whatever the size of the catalogue.
+
+    Args:
+        store (CrawlStore): Deduplicated crawl rows
+        output_path (str): Excel file to write
+
+    Returns:
+        int: Number of rows exported
+    """
+    workbook = Workbook(write_only=True)
+    used_names = {SUMMARY_SHEET.lower()}
+
+    # The summary is small (one row per manufacturer) and goes first
+    summary = store.summary()
+    sheet_names = {marque: sheet_name(marque, used_names) for marque, _, _ in summary}
+    summary_sheet = workbook.create_sheet(SUMMARY_SHEET)
+    summary_sheet.append(['MARQUE', 'MODELES', 'MOTORISATIONS', 'SHEET'])
+    for marque, model_count, row_count in summary:
+        summary_sheet.append([marque, model_count, row_count, sheet_names[marque]])
+    summary_sheet.append(['TOTAL', sum(s[1] for s in summary), sum(s[2] for s in summary), None])
+
+    exported = 0
+    current_marque = None
+    sheet = None
+    for row in store.iter_rows():
+        if row[0] != current_marque:
+            current_marque = row[0]
+            sheet = workbook.create_sheet(sheet_names[current_marque])
+            sheet.append(COLUMNS)
+        sheet.append(row)
+        exported += 1
+
+    workbook.save(output_path)
+    return exported
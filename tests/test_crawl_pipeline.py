@@ -0,0 +1,78 @@
+import sqlite3
+import pytest
+from crawl_pipeline import CrawlPipeline, clean_text
+from crawl_store import CrawlStore
+
+
+def model_page(*motorisations):
+    # cartec.ma lists a placeholder and a first entry before the real motorisations
+    options = "".join(f"<option>\n            {name}</option>" for name in ('--', 'x') + motorisations)
+    return f'<select id="vehicle-select">{options}</select>'
+
+
+def drain(pipeline):
+    messages = []
+    pipeline.drain_events(messages.append)
+    return messages
+
+
+def test_clean_text():
+    assert clean_text("\n            206 (2A/C)    ") == "206 (2A/C)"
+
+
+def test_close_drains_every_submitted_page(tmp_path):
+    store_path = str(tmp_path / 'crawl.sqlite')
+    # Tiny queues so the producer is throttled by backpressure
+    pipeline = CrawlPipeline(store_path, parse_queue_size=1, write_queue_size=1).start()
+    for index in range(50):
+        pipeline.submit('PEUGEOT', f'M{index}', model_page('1.4 HDi', '1.6 16V'))
+    assert pipeline.close() == 100
+    assert pipeline.queue_depths() == {'parse': 0, 'write': 0}
+
+    store = CrawlStore(store_path)
+    assert store.count() == 100
+    store.close()
+
+
+def test_new_rows_by_marque_counts_only_new_rows(tmp_path):
+    store_path = str(tmp_path / 'crawl.sqlite')
+    store = CrawlStore(store_path)
+    store.add_rows([('PEUGEOT', '206', '1.4 HDi')])
+    store.close()
+
+    pipeline = CrawlPipeline(store_path).start()
+    pipeline.submit('PEUGEOT', '206', model_page('1.4 HDi', '1.6 16V'))
+    pipeline.submit('PEUGEOT', '206', model_page('1.4 HDi', '1.6 16V'))
+    pipeline.submit('RENAULT', 'Clio II', model_page('1.5 dCi'))
+    pipeline.submit('CITROEN', 'C3', model_page())
+    assert pipeline.close() == 3
+    assert pipeline.new_rows_by_marque == {'PEUGEOT': 1, 'RENAULT': 1, 'CITROEN': 0}
+    assert drain(pipeline) == [
+        "Model 206: Added 1 new entries",
+        "Model 206: Added 0 new entries",
+        "Model Clio II: Added 1 new entries",
+        "Model C3: Added 0 new entries",
+    ]
+
+
+def test_writer_failure_stops_submit_and_is_raised_by_close(tmp_path):
+    pipeline = CrawlPipeline(str(tmp_path / 'missing' / 'crawl.sqlite')).start()
+    # The writer fails as soon as it opens the store
+    pipeline._writer.join(timeout=5)
+    assert isinstance(pipeline.error, sqlite3.OperationalError)
+
+    with pytest.raises(RuntimeError, match="Crawl pipeline stopped"):
+        pipeline.submit('PEUGEOT', '307', model_page('2.0 HDi'))
+    with pytest.raises(sqlite3.OperationalError) as raised:
+        pipeline.close()
+    assert raised.value is pipeline.error
+
+
+def test_parse_errors_are_reported_and_parsing_continues(tmp_path):
+    pipeline = CrawlPipeline(str(tmp_path / 'crawl.sqlite')).start()
+    pipeline.submit('PEUGEOT', 'broken', None)
+    pipeline.submit('PEUGEOT', '206', model_page('1.4 HDi'))
+    assert pipeline.close() == 1
+    messages = drain(pipeline)
+    assert messages[0].startswith("Error parsing model broken:")
+    assert messages[1] == "Model 206: Added 1 new entries"
@@ -0,0 +1,147 @@
+import math
+from crawl_scheduler import CrawlScheduler, DEFAULT_MODEL_COUNT, DEFAULT_SECONDS_PER_MODEL
+
+HOUR = 3600
+NOW = 100 * HOUR
+
+
+def stats(hours_ago, model_count=10, duration=100, change_rate=1.0):
+    return {
+        'last_crawled': NOW - hours_ago * HOUR,
+        'model_count': model_count,
+        'duration': duration,
+        'change_rate': change_rate,
+    }
+
+
+def test_never_crawled_first_in_given_order():
+    scheduler = CrawlScheduler({'A': stats(50)}, now=NOW)
+    assert scheduler.priority('B') == math.inf
+    assert scheduler.order(['A', 'C', 'B']) == ['C', 'B', 'A']
+
+
+def test_last_crawled_at_epoch_zero_is_not_never_crawled():
+    scheduler = CrawlScheduler({'A': {'last_crawled': 0, 'model_count': 10}}, now=NOW)
+    assert scheduler.priority('A') < math.inf
+
+
+def test_priority_grows_with_staleness_change_rate_and_size():
+    scheduler = CrawlScheduler({
+        'stale': stats(48),
+        'fresh': stats(1),
+        'changing': stats(1, change_rate=5.0),
+        'large': stats(1, model_count=500),
+    }, now=NOW)
+    assert scheduler.priority('stale') > scheduler.priority('fresh')
+    assert scheduler.priority('changing') > scheduler.priority('fresh')
+    assert scheduler.priority('large') > scheduler.priority('fresh')
+
+
+def test_estimated_duration_defaults():
+    scheduler = CrawlScheduler({'A': {'model_count': 4}}, now=NOW)
+    assert scheduler.estimated_duration('A') == 4 * DEFAULT_SECONDS_PER_MODEL
+    assert scheduler.estimated_duration('B') == DEFAULT_MODEL_COUNT * DEFAULT_SECONDS_PER_MODEL
+
+
+def test_order_keeps_what_fits_the_budget():
+    scheduler = CrawlScheduler({
+        'A': stats(40, duration=300),
+        'B': stats(30, duration=200),
+        'C': stats(20, duration=50),
+    }, now=NOW)
+    # A fits, B no longer does, C still fits in the remaining 100s
+    assert scheduler.order(['A', 'B', 'C'], time_budget=400) == ['A', 'C']
+
+
+def test_order_starts_oversized_top_priority_manufacturer():
+    scheduler = CrawlScheduler({
+        'huge': stats(90, duration=1000),
+        'small': stats(10, duration=50),
+    }, now=NOW)
+    assert scheduler.order(['small', 'huge'], time_budget=400) == ['huge']
+    assert scheduler.oversized(['small', 'huge'], time_budget=400) == [('huge', 1000)]
+
+
+def test_order_skips_oversized_manufacturer_once_something_is_selected():
+    scheduler = CrawlScheduler({
+        'huge': stats(10, duration=1000),
+        'small': stats(90, duration=50),
+    }, now=NOW)
+    assert scheduler.order(['small', 'huge'], time_budget=400) == ['small']
+
+
+def test_partial_crawl_resets_staleness_only():
+    history = {'huge': stats(90, duration=1000), 'small': stats(10, duration=50)}
+    scheduler = CrawlScheduler(history, now=NOW)
+    scheduler.record_partial('huge', crawled_at=NOW)
+    assert history['huge']['last_crawled'] == NOW - 90 * HOUR
+    assert history['huge']['duration'] == 1000
+    assert scheduler.order(['small', 'huge'], time_budget=400) == ['small']
+
+
+def test_plan_packs_longest_job_first():
+    scheduler = CrawlScheduler({
+        'A': stats(40, duration=300),
+        'B': stats(30, duration=200),
+        'C': stats(20, duration=150),
+        'D': stats(10, duration=100),
+    }, now=NOW)
+    plan = scheduler.plan(['A', 'B', 'C', 'D'], workers=2)
+    assert plan == [['A', 'D'], ['B', 'C']]
+
+
+def test_plan_respects_per_worker_budget():
+    scheduler = CrawlScheduler({
+        'A': stats(40, duration=600),
+        'B': stats(30, duration=300),
+        'C': stats(20, duration=200),
+        'D': stats(10, duration=150),
+    }, now=NOW)
+    plan = scheduler.plan(['A', 'B', 'C', 'D'], workers=2, time_budget=400)
+    assert all('A' not in queue for queue in plan)
+    for queue in plan:
+        assert sum(scheduler.estimated_duration(name) for name in queue) <= 400
+    assert sorted(name for queue in plan for name in queue) == ['B', 'C', 'D']
+
+
+def test_plan_keeps_priority_order_within_a_worker():
+    scheduler = CrawlScheduler({
+        'small_stale': stats(90, duration=10),
+        'big_fresh': stats(1, duration=500),
+    }, now=NOW)
+    assert scheduler.plan(['big_fresh', 'small_stale'], workers=1) == [['small_stale', 'big_fresh']]
+
+
+def test_record_crawl_and_changes():
+    history = {'A': stats(10)}
+    scheduler = CrawlScheduler(history, now=NOW)
+    scheduler.record_crawl('A', model_count=10, duration=42.0, crawled_at=NOW)
+    scheduler.record_changes('A', new_rows=20, rows_before=100)
+    assert history['A'] == {'last_crawled': NOW, 'model_count': 10, 'duration': 42.0, 'change_rate': 1.5}
+    scheduler.record_changes('A', new_rows=0, rows_before=120)
+    assert history['A']['change_rate'] == 0.75
+
+
+def crawl_nightly(history, name, new_rows, rows_before, night):
+    scheduler = CrawlScheduler(history, now=night * 24 * HOUR)
+    scheduler.record_crawl(name, model_count=10, duration=60, crawled_at=night * 24 * HOUR)
+    scheduler.record_changes(name, new_rows, rows_before)
+
+
+def test_first_crawl_only_sets_the_baseline():
+    history = {}
+    # Never crawled and nothing stored: the whole catalogue is "new"
+    crawl_nightly(history, 'static', new_rows=300, rows_before=0, night=1)
+    # Imported from the legacy xlsx, so stored rows exist but no history does
+    crawl_nightly(history, 'growing', new_rows=0, rows_before=300, night=1)
+    assert 'change_rate' not in history['static']
+    assert 'change_rate' not in history['growing']
+
+    for night in range(2, 5):
+        crawl_nightly(history, 'static', new_rows=0, rows_before=300, night=night)
+        crawl_nightly(history, 'growing', new_rows=20, rows_before=300 + 20 * (night - 2), night=night)
+
+    assert history['static']['change_rate'] == 0.0
+    assert history['growing']['change_rate'] == 2.0
+    scheduler = CrawlScheduler(history, now=5 * 24 * HOUR)
+    assert scheduler.priority('growing') > scheduler.priority('static')
@@ -0,0 +1,38 @@
+from openpyxl import Workbook
+from crawl_store import CrawlStore
+
+ROWS = [
+    ('PEUGEOT', '206', '1.4 HDi'),
+    ('PEUGEOT', '206', '1.6 16V'),
+    ('RENAULT', 'Clio II', '1.5 dCi'),
+]
+
+
+def test_add_rows_skips_duplicates(tmp_path):
+    store = CrawlStore(str(tmp_path / 'crawl.sqlite'))
+    assert store.add_rows(ROWS) == 3
+    assert store.add_rows(ROWS) == 0
+    assert store.add_rows([ROWS[0], ('RENAULT', 'Clio II', '1.2 16V')]) == 1
+    assert store.count() == 4
+    store.close()
+
+
+def test_summary_and_iter_rows(tmp_path):
+    store = CrawlStore(str(tmp_path / 'crawl.sqlite'))
+    store.add_rows([ROWS[2], ROWS[0], ROWS[1]])
+    assert store.summary() == [('PEUGEOT', 1, 2), ('RENAULT', 1, 1)]
+    assert list(store.iter_rows()) == [ROWS[0], ROWS[1], ROWS[2]]
+    store.close()
+
+
+def test_import_excel_reads_legacy_single_sheet(tmp_path):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(['MARQUE', 'MODELE', 'MOTORISATION'])
+    for row in ROWS + [ROWS[0]]:
+        sheet.append(row)
+    workbook.save(tmp_path / 'legacy.xlsx')
+
+    store = CrawlStore(str(tmp_path / 'crawl.sqlite'))
+    assert store.import_excel(str(tmp_path / 'legacy.xlsx')) == 3
+    store.close()
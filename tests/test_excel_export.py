@@ -0,0 +1,71 @@
+from openpyxl import load_workbook
+from crawl_store import CrawlStore
+from excel_export import export_workbook, sheet_name, SUMMARY_SHEET, MAX_SHEET_NAME
+
+ROWS = [
+    ('PEUGEOT', '206', '1.4 HDi'),
+    ('PEUGEOT', '206', '1.6 16V'),
+    ('PEUGEOT', '307', '2.0 HDi'),
+    ('RENAULT', 'Clio II', '1.5 dCi'),
+]
+
+
+def export(tmp_path, rows):
+    store = CrawlStore(str(tmp_path / 'crawl.sqlite'))
+    store.add_rows(rows)
+    exported = export_workbook(store, str(tmp_path / 'out.xlsx'))
+    store.close()
+    return exported, tmp_path / 'out.xlsx'
+
+
+def test_summary_first_then_one_sheet_per_manufacturer(tmp_path):
+    exported, path = export(tmp_path, ROWS)
+    assert exported == 4
+    workbook = load_workbook(path)
+    assert workbook.sheetnames == [SUMMARY_SHEET, 'PEUGEOT', 'RENAULT']
+    assert list(workbook[SUMMARY_SHEET].values) == [
+        ('MARQUE', 'MODELES', 'MOTORISATIONS', 'SHEET'),
+        ('PEUGEOT', 2, 3, 'PEUGEOT'),
+        ('RENAULT', 1, 1, 'RENAULT'),
+        ('TOTAL', 3, 4, None),
+    ]
+    assert list(workbook['PEUGEOT'].values) == [('MARQUE', 'MODELE', 'MOTORISATION')] + ROWS[:3]
+    assert list(workbook['RENAULT'].values) == [('MARQUE', 'MODELE', 'MOTORISATION')] + ROWS[3:]
+
+
+def test_export_round_trips_through_import(tmp_path):
+    _, path = export(tmp_path, ROWS)
+    store = CrawlStore(str(tmp_path / 'reimported.sqlite'))
+    # The Summary sheet has a different header and is skipped
+    assert store.import_excel(str(path)) == 4
+    assert list(store.iter_rows()) == ROWS
+    store.close()
+
+
+def test_sheet_name_replaces_invalid_characters():
+    assert sheet_name('Alfa: Romeo/Giulia [X]*?\\', set()) == 'Alfa_ Romeo_Giulia _X____'
+
+
+def test_sheet_name_truncates_then_strips_apostrophes():
+    name = sheet_name('A' * 30 + "'x", set())
+    assert name == 'A' * 30
+    assert sheet_name("'Quoted'", set()) == 'Quoted'
+    long_name = sheet_name('B' * 40, set())
+    assert len(long_name) == MAX_SHEET_NAME
+
+
+def test_sheet_name_is_unique_ignoring_case():
+    used = {SUMMARY_SHEET.lower()}
+    assert sheet_name('Summary', used) == 'Summary (2)'
+    assert sheet_name('PEUGEOT', used) == 'PEUGEOT'
+    assert sheet_name('Peugeot', used) == 'Peugeot (2)'
+    assert sheet_name('peugeot', used) == 'peugeot (3)'
+    suffixed = sheet_name('C' * 26 + "'" + 'D' * 10, {('C' * 26 + "'" + 'D' * 4).lower()})
+    assert suffixed == 'C' * 26 + ' (2)'
+    assert len(suffixed) <= MAX_SHEET_NAME
+
+
+def test_summary_named_manufacturer_gets_its_own_sheet(tmp_path):
+    _, path = export(tmp_path, [('Summary', 'S1', 'x'), ('summary', 'S2', 'y')])
+    workbook = load_workbook(path)
+    assert workbook.sheetnames == [SUMMARY_SHEET, 'Summary (2)', 'summary (3)']
@@ -0,0 +1,111 @@
+import pandas as pd
+from vehicle_matcher import VehicleMatcher, normalize_text, model_key, tokenize
+
+REFERENCE = pd.DataFrame({
+    'REF_ID': [1, 2, 3, 4, 5],
+    'MARQUE': ['Peugeot', 'Peugeot', 'Renault', 'Renault', 'Citroën'],
+    'MODELE': ['206', '206', 'Clio II', 'Clio III', 'C3'],
+    'MOTORISATION': ['1.4 HDi 70 CV', '1.6 16V 110 CV', '1.5 dCi 65cv', '1.2 16V 75 CV', '1.4 i 75 CV'],
+})
+
+
+def scraped(*rows):
+    return pd.DataFrame(list(rows), columns=['MARQUE', 'MODELE', 'MOTORISATION'])
+
+
+def by_triple(mapping):
+    return {tuple(row[:3]): row for row in mapping.itertuples(index=False, name=None)}
+
+
+def test_normalize_text_strips_accents_and_punctuation():
+    assert normalize_text("Citroën  C3-Picasso") == "CITROEN C3 PICASSO"
+    assert normalize_text("1,6 HDi.") == "1.6 HDI"
+    assert normalize_text(float('nan')) == ""
+
+
+def test_model_key_drops_parenthesised_codes():
+    assert model_key("206 (2A/C)") == model_key("206") == "206"
+    assert model_key(float('nan')) == model_key(None) == ""
+
+
+def test_empty_model_falls_back_to_manufacturer():
+    reference = pd.concat([REFERENCE, pd.DataFrame({
+        'REF_ID': [6], 'MARQUE': ['Peugeot'], 'MODELE': [float('nan')], 'MOTORISATION': ['2.0 HDi 90 CV'],
+    })], ignore_index=True)
+    matcher = VehicleMatcher(reference)
+    assert ('PEUGEOT', 'NAN') not in matcher.model_blocks
+    assert ('PEUGEOT', '') not in matcher.model_blocks
+    mapping = matcher.match(scraped(('PEUGEOT', float('nan'), '1.6 16V 110 CV')))
+    assert mapping.iloc[0]['REF_ID'] == 2
+
+
+def test_tokenize_glues_power_units():
+    assert tokenize("1.4 HDi (70 CV)") == frozenset({"1.4", "HDI", "70CV"})
+    assert tokenize("1,4 hdi 70cv") == tokenize("1.4 HDi 70 CV")
+
+
+def test_match_within_exact_block():
+    mapping = VehicleMatcher(REFERENCE).match(scraped(
+        ('PEUGEOT', '206 (2A/C)', '1.4 HDi (70 CV)'),
+        ('PEUGEOT', '206 (2A/C)', '1.6 16V (110 CV)'),
+        ('CITROEN', 'C3', '1.4 i (75 CV)'),
+    ))
+    rows = by_triple(mapping)
+    assert rows[('PEUGEOT', '206 (2A/C)', '1.4 HDi (70 CV)')][3] == 1
+    assert rows[('PEUGEOT', '206 (2A/C)', '1.6 16V (110 CV)')][3] == 2
+    assert rows[('CITROEN', 'C3', '1.4 i (75 CV)')][3] == 5
+    assert mapping['MATCHED'].all()
+
+
+def test_unknown_model_falls_back_to_manufacturer():
+    mapping = VehicleMatcher(REFERENCE).match(scraped(('RENAULT', 'CLIO III Estate', '1.2 16V 75CV')))
+    row = mapping.iloc[0]
+    assert row['REF_ID'] == 4
+    # Engine matches exactly, model shares 2 of 3 tokens
+    assert abs(row['SCORE'] - (0.7 + 0.3 * 2 / 3)) < 1e-3
+
+
+def test_unknown_manufacturer_is_unmatched():
+    mapping = VehicleMatcher(REFERENCE).match(scraped(('BMW', 'X5', '3.0d')))
+    assert pd.isna(mapping.iloc[0]['REF_ID'])
+    assert not mapping.iloc[0]['MATCHED']
+
+
+def test_min_score_keeps_best_candidate():
+    mapping = VehicleMatcher(REFERENCE, min_score=0.9).match(scraped(('PEUGEOT', '206', '1.4 HDi')))
+    row = mapping.iloc[0]
+    assert row['REF_ID'] == 1
+    assert not row['MATCHED']
+
+
+def test_incremental_match_reuses_unchanged_blocks():
+    matcher = VehicleMatcher(REFERENCE)
+    first = matcher.match(scraped(('PEUGEOT', '206', '1.4 HDi 70 CV')))
+    # Tamper with the cached score to observe reuse
+    first.loc[0, 'SCORE'] = 0.42
+    second = matcher.match(
+        scraped(('PEUGEOT', '206', '1.4 HDi 70 CV'), ('RENAULT', 'Clio II', '1.5 dCi 65 CV')),
+        previous_mapping=first
+    )
+    rows = by_triple(second)
+    assert rows[('PEUGEOT', '206', '1.4 HDi 70 CV')][7] == 0.42
+    assert rows[('RENAULT', 'Clio II', '1.5 dCi 65 CV')][3] == 3
+
+
+def test_incremental_match_rescores_changed_blocks():
+    first = VehicleMatcher(REFERENCE).match(scraped(('PEUGEOT', '206', '1.4 HDi 70 CV')))
+    first.loc[0, 'SCORE'] = 0.42
+    changed = REFERENCE.copy()
+    changed.loc[0, 'MOTORISATION'] = '1.4 HDi 68 CV'
+    second = VehicleMatcher(changed).match(scraped(('PEUGEOT', '206', '1.4 HDi 70 CV')), previous_mapping=first)
+    assert second.iloc[0]['SCORE'] != 0.42
+
+
+def test_incremental_match_applies_new_min_score_to_cached_rows():
+    first = VehicleMatcher(REFERENCE, min_score=0.9).match(scraped(('PEUGEOT', '206', '1.4 HDi')))
+    assert not first.iloc[0]['MATCHED']
+    second = VehicleMatcher(REFERENCE, min_score=0.5).match(
+        scraped(('PEUGEOT', '206', '1.4 HDi')), previous_mapping=first
+    )
+    assert second.iloc[0]['REF_ID'] == 1
+    assert second.iloc[0]['MATCHED']
@@ -0,0 +1,335 @@
+import re
+import hashlib
+import argparse
+import unicodedata
+import numpy as np
+import pandas as pd
+
+KEY_COLUMNS = ['MARQUE', 'MODELE', 'MOTORISATION']
+CACHED_COLUMNS = KEY_COLUMNS + [
+    'REF_ID', 'REF_MARQUE', 'REF_MODELE', 'REF_MOTORISATION', 'SCORE', 'BLOCK_DIGEST'
+]
+MAPPING_COLUMNS = CACHED_COLUMNS + ['MATCHED']
+
+# Weight of the model-name similarity when a row falls back to the manufacturer block
+FALLBACK_MODEL_WEIGHT = 0.3
+# Most similar model names whose rows are scored for a fallback row
+FALLBACK_MODEL_CANDIDATES = 5
+
+
+def normalize_text(value):
+    """
+    Normalize a label for comparison: strip accents, upper-case,
+    unify decimal commas and collapse punctuation/whitespace.
+
+    Args:
+        value: Raw label (any type, NaN becomes an empty string)
+
+    Returns:
+        str: Normalized label
+    """
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return ""
+    text = unicodedata.normalize('NFKD', str(value))
+    text = "".join(c for c in text if not unicodedata.combining(c)).upper()
+    text = re.sub(r'(\d),(\d)', r'\1.\2', text)
+    text = re.sub(r'[^A-Z0-9.]+', ' ', text)
+    text = re.sub(r'(?<!\d)\.|\.(?!\d)', ' ', text)
+    return " ".join(text.split())
+
+
+def model_key(value):
+    """
+    Blocking key for a model name: parenthesised chassis codes and
+    year ranges are dropped so that e.g. "206 (2A/C)" and "206" share a block.
+    """
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return ""
+    return normalize_text(re.sub(r'\(.*?\)', ' ', str(value)))
+
+
+def tokenize(value):
+    """
+    Split a normalized label into tokens, gluing power units to their value
+    ("90 CV" -> "90CV") so they compare as a single token.
+
+    Returns:
+        frozenset: Set of tokens
+    """
+    text = normalize_text(value)
+    text = re.sub(r'\b(\d+)\s+(CV|CH|KW|PS|HP)\b', r'\1\2', text)
+    return frozenset(text.split())
+
+
+class _TokenIndex:
+    """
+    Inverted token -> row index over the token sets of one block. Only the
+    postings of a query's own tokens are read, so scoring cost follows the
+    rows that share a token with the query, not the block size times its
+    vocabulary.
+    """
+
+    def __init__(self, token_sets):
+        postings = {}
+        for position, tokens in enumerate(token_sets):
+            for token in tokens:
+                postings.setdefault(token, []).append(position)
+        self.postings = {token: np.asarray(rows, dtype=np.int64) for token, rows in postings.items()}
+        self.sizes = np.fromiter((len(tokens) for tokens in token_sets), dtype=np.float32, count=len(token_sets))
+
+    def jaccard(self, tokens):
+        """
+        Jaccard similarity of a query token set against the rows it shares a token with.
+
+        Returns:
+            tuple: (sorted candidate positions, their scores); rows sharing no token score 0
+        """
+        lists = [self.postings[token] for token in tokens if token in self.postings]
+        if not lists:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        positions, intersection = np.unique(np.concatenate(lists), return_counts=True)
+        union = len(tokens) + self.sizes[positions] - intersection
+        return positions, intersection / union
+
+
+class VehicleMatcher:
+    """
+    Map scraped (MARQUE, MODELE, MOTORISATION) triples onto an internal
+    reference catalogue.
+
+    Candidates are blocked by normalized manufacturer and model so only
+    rows of the same block are compared; engine labels are scored with a
+    token Jaccard similarity over an inverted index of the block. Rows whose
+    model has no exact block fall back to the rows of the most similar model
+    names of the manufacturer, where the model-name similarity is blended
+    into the score.
+    """
+
+    def __init__(self, reference_df, ref_id_column='REF_ID', min_score=0.5):
+        """
+        Args:
+            reference_df (pd.DataFrame): Catalogue with MARQUE, MODELE,
+                MOTORISATION and an identifier column
+            ref_id_column (str): Name of the identifier column
+            min_score (float): Candidates scoring below this are not flagged as MATCHED
+        """
+        missing = [c for c in KEY_COLUMNS + [ref_id_column] if c not in reference_df.columns]
+        if missing:
+            raise ValueError(f"Reference catalogue is missing columns: {missing}")
+
+        self.ref_id_column = ref_id_column
+        self.min_score = min_score
+
+        reference = reference_df[KEY_COLUMNS + [ref_id_column]].reset_index(drop=True)
+        self.reference_records = list(reference.itertuples(index=False, name=None))
+        self.ref_marque_keys = reference['MARQUE'].map(normalize_text).tolist()
+        self.ref_model_keys = reference['MODELE'].map(model_key).tolist()
+        self.ref_engine_tokens = reference['MOTORISATION'].map(tokenize).tolist()
+        self.ref_model_tokens = reference['MODELE'].map(tokenize).tolist()
+
+        # Block indexes: (marque, model) -> rows and marque -> rows
+        self.model_blocks = {}
+        self.marque_blocks = {}
+        for row, (marque, model) in enumerate(zip(self.ref_marque_keys, self.ref_model_keys)):
+            # Rows without a model name are only reachable through the manufacturer fallback
+            if model:
+                self.model_blocks.setdefault((marque, model), []).append(row)
+            self.marque_blocks.setdefault(marque, []).append(row)
+
+        self.block_digests = {}
+
+    def _block_digest(self, block_key, rows):
+        """Fingerprint of the reference rows of a block, used for incremental re-matching."""
+        if block_key not in self.block_digests:
+            digest = hashlib.sha1()
+            for row in rows:
+                digest.update("\x1f".join(str(v) for v in self.reference_records[row]).encode('utf-8'))
+                digest.update(b"\x1e")
+            self.block_digests[block_key] = digest.hexdigest()[:16]
+        return self.block_digests[block_key]
+
+    def _resolve_block(self, marque, model):
+        """
+        Find the candidate rows for a normalized (marque, model) key.
+
+        Returns:
+            tuple: (block key, candidate rows, whether it is a fallback block)
+        """
+        if (marque, model) in self.model_blocks:
+            return ('MODEL', marque, model), self.model_blocks[(marque, model)], False
+        if marque in self.marque_blocks:
+            return ('MARQUE', marque), self.marque_blocks[marque], True
+        return None, [], False
+
+    def _score_block(self, queries, rows, fallback):
+        """
+        Score a group of scraped rows against the reference rows of one block.
+
+        Returns:
+            list: (best reference row or None, best score) per query
+        """
+        if fallback:
+            return self._score_fallback_block(queries, rows)
+
+        engines = _TokenIndex([self.ref_engine_tokens[r] for r in rows])
+        results = []
+        for query in queries:
+            positions, scores = engines.jaccard(tokenize(query[2]))
+            if len(positions) == 0:
+                results.append((None, 0.0))
+                continue
+            best = scores.argmax()
+            results.append((rows[positions[best]], float(scores[best])))
+        return results
+
+    def _score_fallback_block(self, queries, rows):
+        """
+        Score scraped rows whose model has no exact block against a whole
+        manufacturer. The query model is first compared with the block's
+        distinct model names, and engines are only scored within the rows of
+        the FALLBACK_MODEL_CANDIDATES most similar models. A query whose model
+        shares no token with any of them (e.g. an empty model cell) is scored
+        on its engine against the whole manufacturer.
+        """
+        rows_by_model = {}
+        for row in rows:
+            rows_by_model.setdefault(self.ref_model_tokens[row], []).append(row)
+        model_tokens = list(rows_by_model)
+        models = _TokenIndex(model_tokens)
+        engine_indexes = {}
+        block_engines = None
+
+        results = []
+        for query in queries:
+            model_positions, model_scores = models.jaccard(tokenize(query[1]))
+            engine_tokens = tokenize(query[2])
+            best_row, best_score = None, 0.0
+            if len(model_positions) == 0:
+                if block_engines is None:
+                    block_engines = _TokenIndex([self.ref_engine_tokens[r] for r in rows])
+                positions, scores = block_engines.jaccard(engine_tokens)
+                if len(positions) > 0:
+                    best = scores.argmax()
+                    best_row = rows[positions[best]]
+                    best_score = (1 - FALLBACK_MODEL_WEIGHT) * float(scores[best])
+            for candidate in np.argsort(-model_scores, kind='stable')[:FALLBACK_MODEL_CANDIDATES]:
+                model_rows = rows_by_model[model_tokens[model_positions[candidate]]]
+                if model_positions[candidate] not in engine_indexes:
+                    engine_indexes[model_positions[candidate]] = _TokenIndex(
+                        [self.ref_engine_tokens[r] for r in model_rows]
+                    )
+                positions, scores = engine_indexes[model_positions[candidate]].jaccard(engine_tokens)
+                row, engine_score = model_rows[0], 0.0
+                if len(positions) > 0:
+                    best = scores.argmax()
+                    row, engine_score = model_rows[positions[best]], float(scores[best])
+                score = (1 - FALLBACK_MODEL_WEIGHT) * engine_score + FALLBACK_MODEL_WEIGHT * float(model_scores[candidate])
+                if score > best_score:
+                    best_row, best_score = row, score
+            results.append((best_row, best_score))
+        return results
+
+    def match(self, scraped_df, previous_mapping=None):
+        """
+        Build the mapping table for scraped rows.
+
+        When a previous mapping table is given, rows whose triple was
+        already matched against an unchanged reference block are reused
+        as-is and only new or changed rows are scored. The best candidate is
+        always kept; `min_score` only decides the MATCHED flag, so it can be
+        changed between incremental runs.
+
+        Args:
+            scraped_df (pd.DataFrame): Scraped rows with MARQUE, MODELE, MOTORISATION
+            previous_mapping (pd.DataFrame, optional): Output of an earlier run
+
+        Returns:
+            pd.DataFrame: One row per unique scraped triple with MAPPING_COLUMNS
+        """
+        scraped = scraped_df[KEY_COLUMNS].drop_duplicates(keep='first')
+        triples = list(scraped.itertuples(index=False, name=None))
+
+        previous = {}
+        if previous_mapping is not None and len(previous_mapping) > 0:
+            for record in previous_mapping[CACHED_COLUMNS].to_dict('records'):
+                previous[tuple(record[c] for c in KEY_COLUMNS)] = record
+
+        results = []
+        pending = {}
+        for triple in triples:
+            block_key, rows, fallback = self._resolve_block(
+                normalize_text(triple[0]), model_key(triple[1])
+            )
+            digest = self._block_digest(block_key, rows) if block_key else None
+            cached = previous.get(triple)
+            if cached is not None and cached['BLOCK_DIGEST'] == digest:
+                results.append(cached)
+                continue
+            if block_key is None:
+                results.append(self._record(triple, None, 0.0, None))
+                continue
+            pending.setdefault(block_key, (rows, fallback, digest, []))[3].append(triple)
+
+        for rows, fallback, digest, queries in pending.values():
+            for triple, (row, score) in zip(queries, self._score_block(queries, rows, fallback)):
+                results.append(self._record(triple, row, score, digest))
+
+        mapping = pd.DataFrame(results, columns=CACHED_COLUMNS)
+        mapping['MATCHED'] = mapping['REF_ID'].notna() & (mapping['SCORE'] >= self.min_score)
+        return mapping
+
+    def _record(self, triple, ref_row, score, digest):
+        """Build one mapping table row with the best reference candidate, if any."""
+        record = dict(zip(KEY_COLUMNS, triple))
+        if ref_row is not None:
+            ref_marque, ref_modele, ref_motorisation, ref_id = self.reference_records[ref_row]
+            record.update({
+                'REF_ID': ref_id,
+                'REF_MARQUE': ref_marque,
+                'REF_MODELE': ref_modele,
+                'REF_MOTORISATION': ref_motorisation,
+            })
+        else:
+            record.update({'REF_ID': None, 'REF_MARQUE': None, 'REF_MODELE': None, 'REF_MOTORISATION': None})
+        record['SCORE'] = round(score, 4)
+        record['BLOCK_DIGEST'] = digest
+        return record
+
+
+def read_scraped_excel(file_path):
+    """
+    Read a scraper export, concatenating every sheet that holds vehicle rows
+    (the per-manufacturer sheets; the summary sheet is skipped).
+
+    Returns:
+        pd.DataFrame: Rows with MARQUE, MODELE, MOTORISATION
+    """
+    sheets = pd.read_excel(file_path, sheet_name=None)
+    frames = [df[KEY_COLUMNS] for df in sheets.values() if all(c in df.columns for c in KEY_COLUMNS)]
+    if not frames:
+        return pd.DataFrame(columns=KEY_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Match scraped vehicles against a reference catalogue")
+    parser.add_argument('scraped', help="Scraped Excel file (MARQUE, MODELE, MOTORISATION)")
+    parser.add_argument('reference', help="Reference catalogue Excel file")
+    parser.add_argument('output', help="Mapping table Excel file to write")
+    parser.add_argument('--ref-id-column', default='REF_ID')
+    parser.add_argument('--min-score', type=float, default=0.5)
+    parser.add_argument('--previous', help="Previous mapping table for incremental re-matching")
+    args = parser.parse_args()
+
+    matcher = VehicleMatcher(
+        pd.read_excel(args.reference),
+        ref_id_column=args.ref_id_column,
+        min_score=args.min_score
+    )
+    previous = pd.read_excel(args.previous) if args.previous else None
+    mapping = matcher.match(read_scraped_excel(args.scraped), previous_mapping=previous)
+    mapping.to_excel(args.output, index=False)
+    print(f"Matched {mapping['MATCHED'].sum()} of {len(mapping)} vehicles -> {args.output}")
+
+if __name__ == "__main__":
+    main()